@@ -21,11 +21,16 @@ See .env.example for required variables.
 import argparse
 import fnmatch
 import os
+import re
 import sys
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
 from pathlib import Path
+from typing import Callable
 
 try:
+    import requests
+    from requests.adapters import HTTPAdapter
     from plexapi.server import PlexServer
 except ImportError:
     print("Error: plexapi not installed. Run: pip3 install plexapi")
@@ -36,18 +41,12 @@ def load_dotenv(path: Path) -> None:
     """Minimal .env loader — no external dependencies required."""
     if not path.exists():
         return
-    with path.open() as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#") or "=" not in line:
-                continue
-            key, _, value = line.partition("=")
+    for line in path.read_text().splitlines():
+        key, sep, value = line.strip().partition("=")
+        if sep and not key.startswith("#"):
             os.environ.setdefault(key.strip(), value.strip())
 
 
-load_dotenv(Path(__file__).parent / ".env")
-
-
 def get_config():
     token = os.environ.get("PLEX_TOKEN", "")
     if not token:
@@ -64,29 +63,64 @@ def get_config():
     return url, token
 
 
-def match_pattern(title: str, pattern: str) -> bool:
-    if not any(c in pattern for c in ("*", "?", "[")):
-        pattern = f"*{pattern}*"
-    return fnmatch.fnmatch(title.lower(), pattern.lower())
+# Thread pool size for overlapping Plex API calls.
+_WORKERS = 8
+
+
+def make_session() -> requests.Session:
+    """Return a session that keeps connections to the Plex server alive between calls."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def make_matcher(pattern: str) -> Callable[[str], bool]:
+    """Return a case-insensitive title predicate for a glob pattern, compiled once.
+
+    Plain text (no *, ? or [) matches as a substring. The predicate expects
+    an already-lowercased title so callers can reuse it for other lookups.
+    """
+    pattern_lc = pattern.lower()
+    if not any(c in pattern_lc for c in ("*", "?", "[")):
+        return lambda title_lc: pattern_lc in title_lc
+    regex = re.compile(fnmatch.translate(pattern_lc))
+    return lambda title_lc: regex.match(title_lc) is not None
+
+
+_track_cache: dict[int, list] = {}
+
+
+def album_tracks(album) -> list:
+    """Return the album's tracks, fetching them from Plex at most once per album."""
+    tracks = _track_cache.get(album.ratingKey)
+    if tracks is None:
+        tracks = _track_cache[album.ratingKey] = album.tracks()
+    return tracks
 
 
-def first_file(album) -> str | None:
-    """Return the file path of the first track in the album, or None."""
+def first_part(item):
+    """Return the item's first media part, or None if it has no media."""
+    return item.media[0].parts[0] if item.media and item.media[0].parts else None
+
+
+def first_file(tracks: list) -> str | None:
+    """Return the file path of the first track, or None."""
+    if not tracks:
+        return None
     try:
-        tracks = album.tracks()
-        if not tracks:
-            return None
-        part = next(tracks[0].iterParts(), None)
+        part = first_part(tracks[0])
         return part.file if part else None
     except Exception:
         return None
 
 
-def track_dirs(album) -> set[str]:
-    """Return the set of parent directories containing this album's tracks."""
+def track_dirs(tracks: list) -> set[str]:
+    """Return the set of parent directories containing these tracks."""
     dirs = set()
     try:
-        for track in album.tracks():
+        for track in tracks:
             for part in track.iterParts():
                 if part.file:
                     dirs.add(str(Path(part.file).parent))
@@ -98,7 +132,7 @@ def track_dirs(album) -> set[str]:
 def choose_primary(albums: list) -> tuple:
     """Return (primary, others) — primary has the most tracks; tie breaks by ratingKey."""
     def sort_key(a):
-        return (-len(a.tracks()), a.ratingKey)
+        return (-len(album_tracks(a)), a.ratingKey)
     sorted_albums = sorted(albums, key=sort_key)
     return sorted_albums[0], sorted_albums[1:]
 
@@ -108,21 +142,34 @@ def find_duplicates(section, title_pattern: str | None, album_pattern: str | Non
     artists = section.all()
 
     if title_pattern:
-        artists = [a for a in artists if match_pattern(a.title, title_pattern)]
+        title_match = make_matcher(title_pattern)
+        artists = [a for a in artists if title_match(a.title.lower())]
         if not artists:
             print(f"  No artists matched --title pattern: {title_pattern!r}")
             return []
         print(f"  Matched artists: {', '.join(a.title for a in artists)}\n")
 
-    groups: dict[tuple, list] = defaultdict(list)
-    for artist in artists:
-        for album in artist.albums():
-            if album_pattern and not match_pattern(album.title, album_pattern):
-                continue
-            key = (album.parentTitle.lower(), album.title.lower())
-            groups[key].append(album)
+    with ThreadPoolExecutor(max_workers=_WORKERS) as ex:
+        all_albums = list(chain.from_iterable(ex.map(lambda a: a.albums(), artists)))
+
+    album_match = make_matcher(album_pattern) if album_pattern else None
+    groups: dict[tuple, list] = {}
+    for album in all_albums:
+        title_lc = album.title.lower()
+        if album_match and not album_match(title_lc):
+            continue
+        groups.setdefault((album.parentTitle.lower(), title_lc), []).append(album)
 
-    return [albums for albums in groups.values() if len(albums) > 1]
+    duplicates = [albums for albums in groups.values() if len(albums) > 1]
+
+    # Warm the track cache for every album we're about to review.
+    with ThreadPoolExecutor(max_workers=_WORKERS) as ex:
+        list(ex.map(album_tracks, chain.from_iterable(duplicates)))
+
+    return duplicates
+
+
+_ANSWERS = frozenset(("y", "n", "", "q"))
 
 
 def prompt_merge(primary, others: list) -> str:
@@ -134,14 +181,15 @@ def prompt_merge(primary, others: list) -> str:
     # Collect all track dirs across all duplicates
     all_dirs: set[str] = set()
     for album in all_albums:
-        all_dirs.update(track_dirs(album))
+        all_dirs.update(track_dirs(album_tracks(album)))
 
     print(f"\nDUPLICATE: {artist} - {title}")
     for album in all_albums:
         label = "[PRIMARY]" if album is primary else "[MERGE]  "
-        track_count = len(album.tracks())
+        tracks = album_tracks(album)
+        track_count = len(tracks)
         plural = "track" if track_count == 1 else "tracks"
-        sample_file = first_file(album) or "(no file)"
+        sample_file = first_file(tracks) or "(no file)"
         print(f"  {label} ratingKey={album.ratingKey}  {track_count:3d} {plural}  {sample_file}")
 
     if len(all_dirs) > 1:
@@ -152,12 +200,14 @@ def prompt_merge(primary, others: list) -> str:
             answer = input("Merge? [y/N/q]: ").strip().lower()
         except EOFError:
             return "q"
-        if answer in ("y", "n", "", "q"):
+        if answer in _ANSWERS:
             return answer if answer else "n"
         print("  Please enter y, n, or q.")
 
 
 def main():
+    load_dotenv(Path(__file__).parent / ".env")
+
     parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
     parser.add_argument("--library", metavar="NAME", help="Only process this library section")
     parser.add_argument("--title", metavar="PATTERN", help="Filter by artist name (supports * and ?, case-insensitive)")
@@ -165,7 +215,7 @@ def main():
     args = parser.parse_args()
 
     plex_url, plex_token = get_config()
-    plex = PlexServer(plex_url, plex_token)
+    plex = PlexServer(plex_url, plex_token, session=make_session())
 
     if args.library:
         sections = [plex.library.section(args.library)]
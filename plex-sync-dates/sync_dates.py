@@ -7,7 +7,7 @@ For music libraries, the album's date is set to the oldest track creation time
 (uses the earlier of birth time and modification time for each file).
 
 Usage:
-    python3 sync_dates.py [--dry-run] [--library NAME] [--title PATTERN] [--limit N]
+    python3 sync_dates.py [--dry-run] [--library NAME] [--title PATTERN] [--limit N] [--no-cache]
 
 Options:
     --dry-run         Print what would be changed without applying anything
@@ -15,6 +15,7 @@ Options:
     --title PATTERN   Filter by artist or show name (supports * and ?, case-insensitive)
     --album PATTERN   Filter by album name, music sections only (supports * and ?)
     --limit N         Stop after processing N items (applies to both live and dry-run)
+    --no-cache        Re-check every item, ignoring items recorded as in sync by earlier runs
 
 Config is read from a .env file in the same directory as this script.
 See .env.example for required variables.
@@ -24,12 +25,21 @@ import argparse
 import ctypes
 import ctypes.util
 import fnmatch
+import functools
+import json
 import os
+import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
+from itertools import chain
 from pathlib import Path
+from typing import Callable
 
 try:
+    import requests
+    from requests.adapters import HTTPAdapter
+    from plexapi.exceptions import BadRequest, NotFound
     from plexapi.server import PlexServer
 except ImportError:
     print("Error: plexapi not installed. Run: pip3 install plexapi")
@@ -40,18 +50,12 @@ def load_dotenv(path: Path) -> None:
     """Minimal .env loader — no external dependencies required."""
     if not path.exists():
         return
-    with path.open() as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#") or "=" not in line:
-                continue
-            key, _, value = line.partition("=")
+    for line in path.read_text().splitlines():
+        key, sep, value = line.strip().partition("=")
+        if sep and not key.startswith("#"):
             os.environ.setdefault(key.strip(), value.strip())
 
 
-load_dotenv(Path(__file__).parent / ".env")
-
-
 def get_config():
     token = os.environ.get("PLEX_TOKEN", "")
     if not token:
@@ -66,53 +70,152 @@ def get_config():
         sys.exit(1)
 
     raw_roots = os.environ.get("MEDIA_ROOTS", "")
-    media_roots = [r.strip() for r in raw_roots.split(";") if r.strip()]
+    media_roots = tuple(r.strip() for r in raw_roots.split(";") if r.strip())
 
     return url, token, media_roots
 
 
+CACHE_PATH = Path(__file__).parent / ".sync_dates.cache"
+
+
+def load_cache(path: Path) -> dict[str, list[int]]:
+    """Return the {ratingKey: [addedAt, updatedAt]} map of items found in sync by earlier runs."""
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(path: Path, cache: dict[str, list[int]]) -> None:
+    path.write_text(json.dumps(cache))
+
+
+def cache_stamp(item) -> list[int]:
+    """Return the Plex timestamps that change whenever the item is edited or rescanned."""
+    return [
+        int(item.addedAt.timestamp()) if item.addedAt else 0,
+        int(item.updatedAt.timestamp()) if item.updatedAt else 0,
+    ]
+
+
+def make_session() -> requests.Session:
+    """Return a session that keeps connections to the Plex server alive between calls."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+# Thread pool size for overlapping Plex API calls and file stats.
+_WORKERS = 8
+
+
 def ts_to_date(ts: int) -> date:
     return datetime.fromtimestamp(ts).date()
 
 
-def match_pattern(title: str, pattern: str) -> bool:
-    if not any(c in pattern for c in ("*", "?", "[")):
-        pattern = f"*{pattern}*"
-    return fnmatch.fnmatch(title.lower(), pattern.lower())
+def make_matcher(pattern: str) -> Callable[[str], bool]:
+    """Return a case-insensitive title predicate for a glob pattern, compiled once.
 
+    Plain text (no *, ? or [) matches as a substring. The predicate expects
+    an already-lowercased title so callers can reuse it for other lookups.
+    """
+    pattern_lc = pattern.lower()
+    if not any(c in pattern_lc for c in ("*", "?", "[")):
+        return lambda title_lc: pattern_lc in title_lc
+    regex = re.compile(fnmatch.translate(pattern_lc))
+    return lambda title_lc: regex.match(title_lc) is not None
 
-def iter_items(section, title_pattern: str | None, album_pattern: str | None):
-    """Yield items to process from a section, optionally filtered by title/album pattern.
 
-    For music sections, yields albums (date is set at album level).
-      --title filters by artist name; --album filters by album name.
-    For show sections, yields episodes; --title filters by show name.
-    For movie/other sections, yields items directly; --title filters by item title.
-    """
-    top_level = section.all()
+def _matched_top_level(section, title_pattern: str | None, top_level: list | None = None) -> list:
+    """Return the section's top-level items, filtered by title pattern.
 
+    Pass top_level to filter an already-fetched (e.g. server-filtered) list
+    instead of the whole section.
+    """
+    if top_level is None:
+        top_level = section.all()
     if title_pattern:
-        top_level = [i for i in top_level if match_pattern(i.title, title_pattern)]
+        title_match = make_matcher(title_pattern)
+        top_level = [i for i in top_level if title_match(i.title.lower())]
         if not top_level:
             print(f"  No items matched --title pattern: {title_pattern!r}")
-            return
+            return []
         print(f"  Matched artists/shows: {', '.join(i.title for i in top_level)}\n")
+    return top_level
+
+
+def _glob_filter(field: str, pattern: str) -> dict | None:
+    """Translate a title pattern into an equivalent Plex string filter.
 
-    if section.type == "show":
-        for show in top_level:
-            yield from show.episodes()
-    elif section.type == "artist":
-        seen = set()
-        for artist in top_level:
-            albums = artist.albums()
-            if album_pattern:
-                albums = [a for a in albums if match_pattern(a.title, album_pattern)]
-            for album in albums:
-                if album.ratingKey not in seen:
-                    seen.add(album.ratingKey)
-                    yield album
+    Plain text and *text* map to contains, text* to begins-with and *text to
+    ends-with (Plex string filters are case-insensitive). Returns None for
+    patterns the server can't express, e.g. with ? or [ or an inner *.
+    """
+    text = pattern.strip("*")
+    if any(c in text for c in ("*", "?", "[")):
+        return None
+    if not text:
+        return {}
+    leading, trailing = pattern.startswith("*"), pattern.endswith("*")
+    if leading == trailing:
+        return {field: text}
+    return {f"{field}<=" if trailing else f"{field}>=": text}
+
+
+def _iter_artist(section, title_pattern: str | None, album_pattern: str | None):
+    title_filter = _glob_filter("artist.title", title_pattern) if title_pattern else {}
+    if title_filter is None:
+        # Pattern too complex for a server filter: list matching artists, then their albums.
+        artists = _matched_top_level(section, title_pattern)
+        with ThreadPoolExecutor(max_workers=_WORKERS) as ex:
+            albums = list(chain.from_iterable(ex.map(lambda a: a.albums(), artists)))
     else:
-        yield from top_level
+        # Filters are pushed to the server; make_matcher stays the exact check.
+        if title_pattern:
+            # Report matching artists before any album filter narrows the result.
+            artists = section.search(libtype="artist", filters=title_filter or None)
+            if not _matched_top_level(section, title_pattern, artists):
+                return
+        album_filter = _glob_filter("album.title", album_pattern) if album_pattern else {}
+        filters = {**title_filter, **(album_filter or {})}
+        albums = section.search(libtype="album", filters=filters or None)
+        if title_pattern:
+            title_match = make_matcher(title_pattern)
+            albums = [a for a in albums if title_match(a.parentTitle.lower())]
+    if album_pattern:
+        album_match = make_matcher(album_pattern)
+        albums = [a for a in albums if album_match(a.title.lower())]
+    seen = set()
+    for album in albums:
+        if album.ratingKey not in seen:
+            seen.add(album.ratingKey)
+            yield album
+
+
+def _iter_show(section, title_pattern: str | None, album_pattern: str | None):
+    for show in _matched_top_level(section, title_pattern):
+        yield from show.episodes()
+
+
+def _iter_other(section, title_pattern: str | None, album_pattern: str | None):
+    yield from _matched_top_level(section, title_pattern)
+
+
+_ITER_FNS = {"show": _iter_show, "artist": _iter_artist}
+
+
+def iter_items(section, title_pattern: str | None, album_pattern: str | None):
+    """Yield items to process from a section, optionally filtered by title/album pattern.
+
+    For music sections, yields albums (date is set at album level).
+      --title filters by artist name; --album filters by album name.
+    For show sections, yields episodes; --title filters by show name.
+    For movie/other sections, yields items directly; --title filters by item title.
+    """
+    iter_fn = _ITER_FNS.get(section.type, _iter_other)
+    yield from iter_fn(section, title_pattern, album_pattern)
 
 
 def item_label(item) -> str:
@@ -123,8 +226,13 @@ def item_label(item) -> str:
     return item.title
 
 
+# os.stat() exposes birth time natively on macOS/BSD and on Windows (3.12+);
+# elsewhere we fall back to calling statx() directly through ctypes.
+_HAS_NATIVE_BIRTHTIME = hasattr(os.stat_result, "st_birthtime")
+
 _NR_STATX = 332      # x86_64 syscall number
 _AT_FDCWD = -100
+_STATX_MTIME = 0x40
 _STATX_BTIME = 0x800
 
 
@@ -162,65 +270,125 @@ class _Statx(ctypes.Structure):
 _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
 
 
-def file_birthtime(path: str) -> int:
-    """Return the file creation (birth) time via statx() syscall.
+@functools.lru_cache(maxsize=65536)
+def file_birthtime(path: bytes) -> int:
+    """Return the file creation (birth) time, or mtime if that is earlier.
 
-    Falls back to mtime if the syscall fails or the filesystem doesn't
-    support birth time (stx_btime not set in stx_mask).
+    Uses a single os.stat() where the platform reports birth time, otherwise
+    the statx() syscall. Falls back to mtime if the syscall fails or the
+    filesystem doesn't support birth time (stx_btime not set in stx_mask).
     """
+    if _HAS_NATIVE_BIRTHTIME:
+        st = os.stat(path)
+        return int(min(st.st_birthtime, st.st_mtime))
+
     buf = _Statx()
     ret = _libc.syscall(
         _NR_STATX,
         ctypes.c_int(_AT_FDCWD),
-        ctypes.c_char_p(path.encode()),
+        ctypes.c_char_p(path),
         ctypes.c_int(0),
-        ctypes.c_uint(_STATX_BTIME),
+        ctypes.c_uint(_STATX_MTIME | _STATX_BTIME),
         ctypes.byref(buf),
     )
-    mtime = int(os.path.getmtime(path))
+    if ret == 0 and (buf.stx_mask & _STATX_MTIME):
+        mtime = buf.stx_mtime.tv_sec
+    else:
+        mtime = int(os.path.getmtime(path))
     if ret == 0 and (buf.stx_mask & _STATX_BTIME) and buf.stx_btime.tv_sec:
         return min(buf.stx_btime.tv_sec, mtime)
     return mtime
 
 
-def get_file_mtime(item, media_roots: list[str]) -> tuple[int, str] | tuple[None, str]:
+def first_part(item):
+    """Return the item's first media part, or None if it has no media."""
+    return item.media[0].parts[0] if item.media and item.media[0].parts else None
+
+
+def _track_birthtime(track, media_roots: tuple[str, ...]) -> int | None:
+    """Return the birth time of a track's file, or None if it can't be used."""
+    try:
+        part = first_part(track)
+        if part is None or not part.file:
+            return None
+        if media_roots and not part.file.startswith(media_roots):
+            return None
+        return file_birthtime(os.fsencode(part.file))
+    except Exception:
+        return None
+
+
+def get_file_mtime(item, media_roots: tuple[str, ...], pool: ThreadPoolExecutor) -> tuple[int, str] | tuple[None, str]:
     """Return (birthtime, description) for an item.
 
-    For albums, scans all tracks and returns the oldest birth time.
+    For albums, scans all tracks on the shared pool and returns the oldest birth time.
     For everything else, uses the first media part's file.
     Returns (None, reason) if no usable file was found.
     """
     if item.type == "album":
-        mtimes = []
-        for track in item.tracks():
-            try:
-                part = next(track.iterParts())
-                if not part.file:
-                    continue
-                if media_roots and not any(part.file.startswith(r) for r in media_roots):
-                    continue
-                mtimes.append(file_birthtime(part.file))
-            except Exception:
-                pass
+        results = pool.map(lambda t: _track_birthtime(t, media_roots), item.tracks())
+        mtimes = [m for m in results if m is not None]
         if not mtimes:
             return None, "no accessible track files"
         return min(mtimes), f"{len(mtimes)} tracks scanned"
 
-    part = next(item.iterParts())
-    if not part.file:
+    part = first_part(item)
+    if part is None or not part.file:
         return None, "no file"
-    if media_roots and not any(part.file.startswith(r) for r in media_roots):
+    if media_roots and not part.file.startswith(media_roots):
         return None, f"outside media roots ({part.file})"
-    return file_birthtime(part.file), part.file
+    return file_birthtime(os.fsencode(part.file)), part.file
+
+
+# Max edits queued before they are sent to the server.
+_EDIT_BATCH_SIZE = 50
+
+
+def apply_added_at(section, items: list, added_at: int) -> int:
+    """Set addedAt on items of one type, using a single bulk edit for several.
+
+    Falls back to editing each item individually if the bulk edit is
+    rejected by the server. Returns the number of items that could not be
+    updated.
+    """
+    if len(items) > 1:
+        try:
+            section.batchMultiEdits(items).editAddedAt(added_at).saveMultiEdits()
+            return 0
+        except (BadRequest, NotFound):
+            pass
+        except Exception as e:
+            for item in items:
+                print(f"  ERROR: {item_label(item)}: {e}")
+            return len(items)
+
+    failed = 0
+    for item in items:
+        try:
+            item.editAddedAt(added_at)
+        except Exception as e:
+            print(f"  ERROR: {item_label(item)}: {e}")
+            failed += 1
+    return failed
+
+
+def flush_pending(section, pending: dict[tuple[str, int], list]) -> int:
+    """Apply and clear queued addedAt edits. Returns the number that failed."""
+    failed = sum(apply_added_at(section, items, added_at) for (_, added_at), items in pending.items())
+    pending.clear()
+    return failed
 
 
 def main():
+    load_dotenv(Path(__file__).parent / ".env")
+
     parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
     parser.add_argument("--dry-run", action="store_true", help="Print changes without applying them")
     parser.add_argument("--library", metavar="NAME", help="Only process this library section")
     parser.add_argument("--title", metavar="PATTERN", help="Filter by artist/show name (supports * and ?, case-insensitive)")
     parser.add_argument("--album", metavar="PATTERN", help="Filter by album name for music sections (supports * and ?, case-insensitive)")
     parser.add_argument("--limit", metavar="N", type=int, help="Stop after processing N items")
+    parser.add_argument("--no-cache", action="store_true", help="Re-check items recorded as in sync by earlier runs")
     args = parser.parse_args()
 
     if args.dry_run:
@@ -230,54 +398,81 @@ def main():
 
     plex_url, plex_token, media_roots = get_config()
 
-    plex = PlexServer(plex_url, plex_token)
+    plex = PlexServer(plex_url, plex_token, session=make_session())
 
     if args.library:
         sections = [plex.library.section(args.library)]
     else:
         sections = plex.library.sections()
 
+    cache = None if args.no_cache else load_cache(CACHE_PATH)
+
     updated = 0
     skipped = 0
     errors = 0
     done = False
 
-    for section in sections:
-        print(f"=== {section.title} ===")
-        for item in iter_items(section, args.title, args.album):
-            label = item_label(item)
+    pool = ThreadPoolExecutor(max_workers=_WORKERS)
+    try:
+        for section in sections:
+            print(f"=== {section.title} ===")
+            # (item type, addedAt) -> items waiting for a bulk edit
+            pending: dict[tuple[str, int], list] = {}
             try:
-                file_mtime, detail = get_file_mtime(item, media_roots)
-
-                if file_mtime is None:
-                    print(f"  SKIP ({detail}): {label}")
-                    skipped += 1
-                    continue
-
-                file_date = ts_to_date(file_mtime)
-                current_date = ts_to_date(int(item.addedAt.timestamp())) if item.addedAt else None
-
-                if current_date == file_date:
-                    skipped += 1
-                    continue
-
-                print(f"  {'WOULD UPDATE' if args.dry_run else 'UPDATE'}: "
-                      f"{label}  {current_date} -> {file_date}  [{detail}]")
-
-                if not args.dry_run:
-                    item.editAddedAt(file_mtime)
-
-                updated += 1
-                if args.limit and updated >= args.limit:
-                    done = True
-                    break
-
-            except Exception as e:
-                print(f"  ERROR: {label}: {e}")
-                errors += 1
-
-        if done:
-            break
+                for item in iter_items(section, args.title, args.album):
+                    label = item_label(item)
+                    try:
+                        if cache is not None and cache.get(str(item.ratingKey)) == cache_stamp(item):
+                            skipped += 1
+                            continue
+
+                        file_mtime, detail = get_file_mtime(item, media_roots, pool)
+
+                        if file_mtime is None:
+                            print(f"  SKIP ({detail}): {label}")
+                            skipped += 1
+                            continue
+
+                        file_date = ts_to_date(file_mtime)
+                        current_date = ts_to_date(int(item.addedAt.timestamp())) if item.addedAt else None
+
+                        if current_date == file_date:
+                            if cache is not None:
+                                cache[str(item.ratingKey)] = cache_stamp(item)
+                            skipped += 1
+                            continue
+
+                        print(f"  {'WOULD UPDATE' if args.dry_run else 'UPDATE'}: "
+                              f"{label}  {current_date} -> {file_date}  [{detail}]")
+
+                        if not args.dry_run:
+                            pending.setdefault((item.type, file_mtime), []).append(item)
+                            if sum(len(g) for g in pending.values()) >= _EDIT_BATCH_SIZE:
+                                failed = flush_pending(section, pending)
+                                updated -= failed
+                                errors += failed
+
+                        updated += 1
+                        if args.limit and updated >= args.limit:
+                            done = True
+                            break
+
+                    except Exception as e:
+                        print(f"  ERROR: {label}: {e}")
+                        errors += 1
+            finally:
+                # Apply edits already reported as UPDATE even if the run is interrupted.
+                failed = flush_pending(section, pending)
+                updated -= failed
+                errors += failed
+
+            if done:
+                break
+    finally:
+        pool.shutdown()
+        # Keep entries recorded so far even if the run is interrupted.
+        if cache is not None:
+            save_cache(CACHE_PATH, cache)
 
     print(f"\nDone. Updated: {updated}, Skipped (already correct): {skipped}, Errors: {errors}")
 